@@ -5,22 +5,250 @@ Fixed escalation for critical incidents (data loss, payment outage, revenue impa
 
 from tensorlake.applications import application, function, Image
 from langchain_groq import ChatGroq
+from langchain_core.messages import HumanMessage, SystemMessage
 from exa_py import Exa
 from pydantic import BaseModel
+import numpy as np
+import orjson
+import asyncio
+import copy
+import hashlib
 import os
 import re
+import string
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
-from typing import Dict, Any, Optional, List
+from typing import Callable, Dict, Any, Optional, List
 
 # ============================================================================
 # TENSORLAKE IMAGE CONFIGURATION
 # ============================================================================
+# Used by the semantic cache. Downloaded while the image is built so no
+# request ever waits on a Hugging Face download.
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
 agent_image = (
     Image(base_image="python:3.11-slim")
     .run("apt-get update && apt-get install -y ca-certificates && rm -rf /var/lib/apt/lists/*")
     .run("pip install --no-cache-dir langchain langchain-groq langchain-core exa-py requests")
+    .run("pip install --no-cache-dir torch --index-url https://download.pytorch.org/whl/cpu")
+    .run("pip install --no-cache-dir sentence-transformers numpy orjson")
+    .run(
+        "python -c \"from sentence_transformers import SentenceTransformer; "
+        f"SentenceTransformer('{EMBEDDING_MODEL}')\""
+    )
 )
 
+# The small model handles routine triage; the large one is only called when
+# the small model's confidence falls below FALLBACK_CONFIDENCE.
+REASONING_MODEL = "llama-3.1-8b-instant"
+FALLBACK_REASONING_MODEL = "llama-3.3-70b-versatile"
+FALLBACK_CONFIDENCE = 0.4
+# Bump whenever a prompt changes so stale cached decisions are not served.
+PROMPT_VERSION = "6"
+# Alerts reasoned about per Groq call in outage_agent_batch.
+BATCH_SIZE = 8
+
+# ============================================================================
+# API CLIENTS
+# ============================================================================
+# Created lazily and reused so HTTP keep-alive and TLS sessions carry over.
+# ChatGroq's async connections belong to the event loop that opened them, and
+# Tensorlake runs every async function call under its own asyncio.run, so
+# Groq clients are cached per running loop and dropped once it closes. The
+# synchronous Exa client lives for the whole worker.
+_groq_clients: Dict[asyncio.AbstractEventLoop, Dict[str, ChatGroq]] = {}
+_groq_clients_lock = threading.Lock()
+_exa_client: Optional[Exa] = None
+
+
+def _groq(model: str) -> ChatGroq:
+    with _groq_clients_lock:
+        for loop in [loop for loop in _groq_clients if loop.is_closed()]:
+            del _groq_clients[loop]
+        clients = _groq_clients.setdefault(asyncio.get_running_loop(), {})
+        if model not in clients:
+            clients[model] = ChatGroq(
+                model=model,
+                groq_api_key=os.environ["GROQ_API_KEY"],
+                temperature=0.1
+            )
+        return clients[model]
+
+
+def _exa() -> Exa:
+    global _exa_client
+    if _exa_client is None:
+        _exa_client = Exa(api_key=os.environ["EXA_API_KEY"])
+    return _exa_client
+
+
+# --- compiled patterns ---
+# Timestamps and incident ids vary between otherwise identical alerts
+# (e.g. during an alert storm), so they are stripped before hashing.
+_VOLATILE_RE = re.compile(r'\b\d{2}:\d{2}:\d{2}\b|\binc-[\w-]+\b')
+_WHITESPACE_RE = re.compile(r'\s+')
+_ERROR_CODE_RE = re.compile(r'\b(?:5\d{2}|4\d{2})\b')
+
+# ============================================================================
+# RESPONSE CACHE
+# ============================================================================
+class _TTLCache:
+    """Thread-safe LRU cache whose entries expire after ``ttl`` seconds."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Any, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Any) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Any, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+
+_response_cache = _TTLCache(maxsize=1024, ttl=600)
+
+
+def _normalize_alert(alert_description: str) -> str:
+    text = _VOLATILE_RE.sub(" ", alert_description.lower())
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def _response_cache_key(alert_description: str) -> str:
+    material = f"{_normalize_alert(alert_description)}|{REASONING_MODEL}|{FALLBACK_REASONING_MODEL}|{PROMPT_VERSION}"
+    return hashlib.blake2b(material.encode(), digest_size=16).hexdigest()
+
+
+# ============================================================================
+# SEMANTIC CACHE
+# ============================================================================
+# Catches paraphrased alerts ("Payment svc down" vs "Payments service is
+# offline") that the exact-match cache misses.
+SEMANTIC_CACHE_THRESHOLD = 0.92
+
+_embedder = None
+_embedder_failed = False
+_embedder_lock = threading.Lock()
+
+
+def _load_embedder():
+    """Load the embedding model once; None if it can't be loaded.
+
+    A failed load is remembered, so later requests skip the semantic cache
+    instead of retrying the load on the request path.
+    """
+    global _embedder, _embedder_failed
+    with _embedder_lock:
+        if _embedder is None and not _embedder_failed:
+            try:
+                from sentence_transformers import SentenceTransformer
+                _embedder = SentenceTransformer(EMBEDDING_MODEL)
+            except Exception:
+                _embedder_failed = True
+        return _embedder
+
+
+def _encode_alert(alert_description: str) -> Optional[np.ndarray]:
+    embedder = _load_embedder()
+    if embedder is None:
+        return None
+    vector = embedder.encode(_normalize_alert(alert_description), normalize_embeddings=True)
+    return np.asarray(vector, dtype=np.float32)
+
+
+async def _embed_alert(alert_description: str) -> Optional[np.ndarray]:
+    """Return a unit-length embedding, or None if the model is unavailable."""
+    try:
+        # Loading and encoding are CPU-bound; keep them off the event loop.
+        return await asyncio.to_thread(_encode_alert, alert_description)
+    except Exception:
+        return None
+
+
+class _SemanticCache:
+    """Nearest-neighbour cache over normalized embeddings (inner product == cosine)."""
+
+    def __init__(self, maxsize: int, ttl: float, threshold: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.threshold = threshold
+        self._vectors: Optional[np.ndarray] = None
+        self._entries: List[tuple] = []
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        vector: Optional[np.ndarray],
+        accept: Callable[[Any], bool] = lambda value: True
+    ) -> Optional[Any]:
+        """Return the closest live entry above the threshold that ``accept`` allows."""
+        if vector is None:
+            return None
+        with self._lock:
+            self._prune()
+            if self._vectors is None:
+                return None
+            scores = self._vectors @ vector
+            for i in np.argsort(scores)[::-1]:
+                if scores[i] < self.threshold:
+                    break
+                value = self._entries[i][1]
+                if accept(value):
+                    return value
+            return None
+
+    def set(self, vector: Optional[np.ndarray], value: Any) -> None:
+        if vector is None:
+            return
+        with self._lock:
+            self._prune()
+            row = vector[np.newaxis, :]
+            self._vectors = row if self._vectors is None else np.vstack([self._vectors, row])
+            self._entries.append((time.monotonic() + self.ttl, value))
+            if len(self._entries) > self.maxsize:
+                self._vectors = self._vectors[-self.maxsize:]
+                self._entries = self._entries[-self.maxsize:]
+
+    def _prune(self) -> None:
+        # Every entry gets the same ttl, so expired rows are always a prefix.
+        now = time.monotonic()
+        expired = next(
+            (i for i, (expires_at, _) in enumerate(self._entries) if expires_at >= now),
+            len(self._entries)
+        )
+        if expired:
+            self._entries = self._entries[expired:]
+            self._vectors = self._vectors[expired:] if self._entries else None
+
+
+_semantic_cache = _SemanticCache(maxsize=1024, ttl=600, threshold=SEMANTIC_CACHE_THRESHOLD)
+
+
+def _from_cache(cached_bundle: Dict[str, Any], incident_id: str) -> Dict[str, Any]:
+    """Clone a cached decision bundle and give it this request's incident id."""
+    decision_bundle = copy.deepcopy(cached_bundle)
+    decision_bundle["decision"]["incident_id"] = incident_id
+    return decision_bundle
+
+
 # ============================================================================
 # OUTPUT MODELS
 # ============================================================================
@@ -53,27 +281,175 @@ class OutageAgentOutput(BaseModel):
     memory=4,
     timeout=300
 )
-def outage_agent(alert_description: str) -> OutageAgentOutput:
+async def outage_agent(alert_description: str) -> OutageAgentOutput:
     if not alert_description or not alert_description.strip():
         raise ValueError("No alert description provided")
 
-    alert_info = understand_alert(alert_description.strip())
+    incident_id, timestamp = _request_clock()
+    triage = await _triage(
+        alert_description, _response_cache_key(alert_description), incident_id, timestamp
+    )
+    if "decision_bundle" in triage:
+        return _build_output(triage["decision_bundle"])
+
+    alert_info = triage["alert_info"]
     internal_context = gather_internal_context(alert_info)
-    reasoning = reason_with_groq(alert_info, internal_context)
 
-    external_knowledge = None
-    if reasoning.get("needs_external_knowledge", True):
-        external_knowledge = fetch_external_knowledge(alert_info, reasoning)
+    # The Exa search is gated on a cheap heuristic rather than on the LLM's
+    # answer, and nothing in the decision waits for it.
+    _fetch_external_knowledge_in_background(alert_info)
+    reasoning = await reason_with_groq(alert_info, internal_context)
+
+    return _finish(triage, internal_context, reasoning)
+
+
+@application()
+@function(
+    image=agent_image,
+    secrets=["GROQ_API_KEY", "EXA_API_KEY"],
+    cpu=2,
+    memory=4,
+    timeout=300
+)
+async def outage_agent_batch(alert_descriptions: List[str]) -> List[OutageAgentOutput]:
+    """Analyze a burst of alerts, sharing Groq calls across them.
+
+    Duplicate alerts (same normalized text) are analyzed once, and the rest
+    are reasoned about BATCH_SIZE at a time in a single prompt. Every alert
+    still gets its own incident id: the request's id plus its position.
+    """
+    if not alert_descriptions or any(not a or not a.strip() for a in alert_descriptions):
+        raise ValueError("No alert description provided")
+
+    incident_id, timestamp = _request_clock()
+    keys = [_response_cache_key(a) for a in alert_descriptions]
+    first_index = {}
+    for i, key in enumerate(keys):
+        first_index.setdefault(key, i)
+
+    outputs: Dict[str, OutageAgentOutput] = {}
+    pending: List[Dict[str, Any]] = []
+    triages = await asyncio.gather(*(
+        _triage(alert_descriptions[i], key, f"{incident_id}-{i}", timestamp)
+        for key, i in first_index.items()
+    ))
+    for key, triage in zip(first_index, triages):
+        if "decision_bundle" in triage:
+            outputs[key] = _build_output(triage["decision_bundle"])
+        else:
+            pending.append(triage)
+
+    alert_infos = [t["alert_info"] for t in pending]
+    internal_contexts = [gather_internal_context(a) for a in alert_infos]
+
+    reasoning_futures = [
+        reason_batch_with_groq.future(
+            alert_infos[n:n + BATCH_SIZE],
+            internal_contexts[n:n + BATCH_SIZE]
+        ).run()
+        for n in range(0, len(pending), BATCH_SIZE)
+    ]
+    for alert_info in alert_infos:
+        _fetch_external_knowledge_in_background(alert_info)
+    reasonings = [r for future in reasoning_futures for r in await future]
+
+    for triage, internal_context, reasoning in zip(pending, internal_contexts, reasonings):
+        outputs[triage["cache_key"]] = _finish(triage, internal_context, reasoning)
+
+    results = []
+    for i, key in enumerate(keys):
+        output = outputs[key]
+        if i != first_index[key]:
+            # Duplicates share the analysis but are still separate incidents.
+            decision_bundle = _from_cache(output.model_dump(), f"{incident_id}-{i}")
+            _store_in_background(decision_bundle, timestamp)
+            output = _build_output(decision_bundle)
+        results.append(output)
+    return results
+
+
+def _request_clock() -> tuple:
+    """Read the clock once per request: (incident_id, ISO timestamp)."""
+    now = datetime.now()
+    return f"inc-{now:%Y-%m-%d-%H%M}", now.isoformat()
+
+
+async def _triage(
+    alert_description: str,
+    cache_key: str,
+    incident_id: str,
+    timestamp: str
+) -> Dict[str, Any]:
+    """Resolve an alert without the LLM where possible.
 
+    Returns {"decision_bundle": ...} when a cache or the critical-keyword
+    override settles it, otherwise the state _finish needs after reasoning.
+    """
+    cached_bundle = _response_cache.get(cache_key)
+    if cached_bundle is not None:
+        decision_bundle = _from_cache(cached_bundle, incident_id)
+        _store_in_background(decision_bundle, timestamp)
+        return {"decision_bundle": decision_bundle}
+
+    alert_info = understand_alert(alert_description.strip())
+
+    # Business-critical keywords force escalation regardless of what the
+    # model says, so skip the LLM and escalate straight away.
+    if alert_info["force_escalate"]:
+        decision_bundle = direct_escalation(alert_info, incident_id)
+        _store_in_background(decision_bundle, timestamp)
+        return {"decision_bundle": decision_bundle}
+
+    alert_vector = await _embed_alert(alert_description)
+    # A close paraphrase about another service or severity is a different
+    # incident, so only reuse decisions made for the same ones.
+    cached_bundle = _semantic_cache.get(
+        alert_vector,
+        lambda bundle: (
+            bundle["decision"]["service"] == alert_info["service"]
+            and bundle["decision"]["severity"] == alert_info["severity"]
+        )
+    )
+    if cached_bundle is not None:
+        decision_bundle = _from_cache(cached_bundle, incident_id)
+        _store_in_background(decision_bundle, timestamp)
+        return {"decision_bundle": decision_bundle}
+
+    return {
+        "cache_key": cache_key,
+        "alert_vector": alert_vector,
+        "alert_info": alert_info,
+        "incident_id": incident_id,
+        "timestamp": timestamp
+    }
+
+
+def _finish(
+    triage: Dict[str, Any],
+    internal_context: Dict[str, Any],
+    reasoning: Dict[str, Any]
+) -> OutageAgentOutput:
     decision_bundle = make_decision(
-        alert_info,
+        triage["alert_info"],
         internal_context,
         reasoning,
-        external_knowledge
+        triage["incident_id"]
     )
+    # Validate before storing or caching, so a malformed decision fails this
+    # request only instead of being served from the cache afterwards.
+    output = _build_output(decision_bundle)
+
+    _store_in_background(decision_bundle, triage["timestamp"])
+
+    # Don't pin a transient Groq failure in the cache.
+    if reasoning.get("likely_issue") != REASONING_FAILED:
+        _response_cache.set(triage["cache_key"], copy.deepcopy(decision_bundle))
+        _semantic_cache.set(triage["alert_vector"], copy.deepcopy(decision_bundle))
 
-    verify_and_store(decision_bundle)
+    return output
 
+
+def _build_output(decision_bundle: Dict[str, Any]) -> OutageAgentOutput:
     return OutageAgentOutput(
         summary=decision_bundle["summary"],
         decision=OutageDecision(**decision_bundle["decision"])
@@ -83,40 +459,96 @@ def outage_agent(alert_description: str) -> OutageAgentOutput:
 # ============================================================================
 # STEP 1: UNDERSTAND ALERT
 # ============================================================================
-@function(image=agent_image)
-def understand_alert(alert_description: str) -> Dict[str, Any]:
-    alert_lower = alert_description.lower()
-
-    known_services = [
-        "payment", "billing", "checkout", "auth",
-        "login", "database", "user", "api", "core", "gateway"
-    ]
+KNOWN_SERVICES = [
+    "payment", "billing", "checkout", "auth",
+    "login", "database", "user", "api", "core", "gateway"
+]
+
+SEVERITY_KEYWORDS = {
+    "critical": [
+        "critical", "outage", "down", "data loss",
+        "corruption", "irreversible", "revenue impact",
+        "transactions failing"
+    ],
+    "high": ["spike", "surge", "800%", "severe"],
+    "medium": ["degradation", "slow", "increased"],
+    "low": ["minor", "warning"]
+}
+
+# Business-critical terms that always force human escalation.
+CRITICAL_KEYWORDS = [
+    "data loss", "corruption", "payment",
+    "billing", "checkout", "revenue", "breach"
+]
+
+
+def _build_keyword_index() -> Dict[str, List[tuple]]:
+    """Map each keyword to its (category, value) tags.
+
+    A keyword also carries the tags of every keyword it contains, so a hit
+    on "revenue impact" counts as a hit on "revenue" as well.
+    """
+    tags: Dict[str, List[tuple]] = {}
+    for svc in KNOWN_SERVICES:
+        tags.setdefault(svc, []).append(("service", svc))
+    for sev, kws in SEVERITY_KEYWORDS.items():
+        for kw in kws:
+            tags.setdefault(kw, []).append(("severity", sev))
+    for kw in CRITICAL_KEYWORDS:
+        tags.setdefault(kw, []).append(("critical", kw))
 
-    service = next((s for s in known_services if s in alert_lower), "unknown-service")
-
-    severity_keywords = {
-        "critical": [
-            "critical", "outage", "down", "data loss",
-            "corruption", "irreversible", "revenue impact",
-            "transactions failing"
-        ],
-        "high": ["spike", "surge", "800%", "severe"],
-        "medium": ["degradation", "slow", "increased"],
-        "low": ["minor", "warning"]
+    return {
+        kw: [tag for other, other_tags in tags.items() if other in kw for tag in other_tags]
+        for kw in tags
     }
 
-    severity = "medium"
-    for sev, kws in severity_keywords.items():
-        if any(k in alert_lower for k in kws):
-            severity = sev
-            break
 
-    error_codes = re.findall(r'\b(?:5\d{2}|4\d{2})\b', alert_description)
+_KEYWORD_INDEX = _build_keyword_index()
+# The lookahead reports the longest keyword starting at every offset, which
+# (with the containment tags above) matches plain substring semantics in one scan.
+_KEYWORD_RE = re.compile(
+    "(?=(" + "|".join(re.escape(kw) for kw in sorted(_KEYWORD_INDEX, key=len, reverse=True)) + "))"
+)
+
+# Highest-ranked matched severity wins, independent of table order.
+_SEVERITY_PRIORITY = {"critical": 3, "high": 2, "medium": 1, "low": 0}
+
+
+def understand_alert(alert_description: str) -> Dict[str, Any]:
+    """Scan the alert for its service, severity and critical keywords.
+
+    A plain helper like gather_internal_context: one regex pass is far
+    cheaper than a Tensorlake scheduling hop.
+    """
+    alert_lower = alert_description.lower()
+
+    keywords: List[str] = []
+    services, severities = set(), set()
+    force_escalate = False
+    for match in _KEYWORD_RE.finditer(alert_lower):
+        kw = match.group(1)
+        if kw in keywords:
+            continue
+        keywords.append(kw)
+        for category, value in _KEYWORD_INDEX[kw]:
+            if category == "service":
+                services.add(value)
+            elif category == "severity":
+                severities.add(value)
+            else:
+                force_escalate = True
+
+    service = next((s for s in KNOWN_SERVICES if s in services), "unknown-service")
+    severity = max(severities, key=_SEVERITY_PRIORITY.get, default="medium")
+
+    error_codes = _ERROR_CODE_RE.findall(alert_description)
 
     return {
         "service": service,
         "severity": severity,
+        "keywords": keywords,
         "error_codes": error_codes,
+        "force_escalate": force_escalate,
         "raw_alert": alert_description
     }
 
@@ -124,12 +556,15 @@ def understand_alert(alert_description: str) -> Dict[str, Any]:
 # ============================================================================
 # STEP 2: GATHER INTERNAL CONTEXT
 # ============================================================================
-@function(image=agent_image)
 def gather_internal_context(alert_info: Dict[str, Any]) -> Dict[str, Any]:
     """
     NOTE: Placeholder implementation.
     In a real system, this would query Kubernetes, Datadog,
     cloud monitoring APIs, or internal observability systems.
+
+    Deliberately a plain helper rather than a @function: building a stub
+    dict isn't worth a Tensorlake scheduling hop. Once it does real I/O,
+    make it async and run it alongside the keyword scan with asyncio.gather.
     """
     service = alert_info.get("service", "unknown")
 
@@ -144,87 +579,307 @@ def gather_internal_context(alert_info: Dict[str, Any]) -> Dict[str, Any]:
 # ============================================================================
 # STEP 3: REASON WITH GROQ
 # ============================================================================
+REASONING_SYSTEM_PROMPT = """You are an on-call site reliability engineer triaging a production alert.
+You will be given the parsed ALERT and the INTERNAL CONTEXT gathered for it, both as JSON.
+In ALERT, svc is the service, sev the severity, kw the matched keywords, err the HTTP
+error codes and txt the (possibly truncated) alert text.
+Identify the most likely issue and its probable root cause, estimate your confidence
+between 0.0 and 1.0, and say whether this looks like a familiar, previously seen pattern.
+
+Respond with only this JSON object and nothing else. Use double-quoted keys and strings,
+a number for confidence and true/false for is_familiar:
+{
+  "likely_issue": "...",
+  "probable_root_cause": "...",
+  "confidence": 0.0,
+  "is_familiar": false
+}"""
+
+# Built once: the system message is identical on every call, and at call
+# time only the compact JSON payloads are substituted into the user message.
+_REASONING_SYSTEM_MESSAGE = SystemMessage(content=REASONING_SYSTEM_PROMPT)
+_REASONING_USER_TMPL = string.Template("ALERT:\n$alert_json\n\nINTERNAL CONTEXT:\n$ctx_json")
+
+
 @function(image=agent_image, secrets=["GROQ_API_KEY"])
-def reason_with_groq(
+async def reason_with_groq(
     alert_info: Dict[str, Any],
     internal_context: Dict[str, Any]
 ) -> Dict[str, Any]:
-    llm = ChatGroq(
-        model="llama-3.3-70b-versatile",
-        groq_api_key=os.environ["GROQ_API_KEY"],
-        temperature=0.1
-    )
+    messages = _reasoning_messages(alert_info, internal_context)
 
-    prompt = f"""
-ALERT:
-{alert_info}
+    reasoning = await _reason(REASONING_MODEL, messages)
+    if _confidence(reasoning) < FALLBACK_CONFIDENCE:
+        reasoning = await _reason(FALLBACK_REASONING_MODEL, messages)
+    return reasoning
 
-INTERNAL CONTEXT:
-{internal_context}
 
-Return JSON:
-{{
-  "likely_issue": "...",
-  "probable_root_cause": "...",
-  "confidence": 0.0,
-  "is_familiar": false,
-  "needs_external_knowledge": true
-}}
-"""
+def _reasoning_messages(
+    alert_info: Dict[str, Any],
+    internal_context: Dict[str, Any]
+) -> List[Any]:
+    # Per-alert data goes last so the static system prefix stays
+    # byte-identical across calls and can hit Groq's prompt cache.
+    return [
+        _REASONING_SYSTEM_MESSAGE,
+        HumanMessage(content=_REASONING_USER_TMPL.substitute(
+            alert_json=_dump(_compact_alert(alert_info)),
+            ctx_json=_dump(internal_context)
+        ))
+    ]
+
 
+async def _reason(model: str, messages: List[Any]) -> Dict[str, Any]:
     try:
-        response = llm.invoke(prompt)
-        match = re.search(r'\{.*\}', response.content, re.DOTALL)
-        return eval(match.group(0)) if match else {}
+        blob = await _stream_json(_groq(model), messages)
+        return orjson.loads(blob) if blob else {}
     except Exception as e:
-        return {
-            "likely_issue": "Reasoning failed",
-            "probable_root_cause": str(e),
-            "confidence": 0.0,
-            "is_familiar": False,
-            "needs_external_knowledge": True
-        }
+        return _reasoning_failure(e)
+
+
+def _confidence(reasoning: Any) -> float:
+    """The model's confidence as a float; 0.0 if missing or malformed."""
+    try:
+        return float(reasoning.get("confidence", 0.0))
+    except (AttributeError, TypeError, ValueError):
+        return 0.0
+
+
+BATCH_REASONING_SYSTEM_PROMPT = """You are an on-call site reliability engineer triaging a burst of production alerts.
+You will be given ALERTS, a JSON array where each item holds the parsed alert and the
+internal context gathered for it. In each alert, svc is the service, sev the severity,
+kw the matched keywords, err the HTTP error codes and txt the (possibly truncated) alert
+text. For each alert independently, identify the most likely
+issue and its probable root cause, estimate your confidence between 0.0 and 1.0, and say
+whether it looks like a familiar, previously seen pattern.
+
+Respond with only this JSON object and nothing else, with exactly one result per alert
+in the same order as ALERTS. Use double-quoted keys and strings, a number for confidence
+and true/false for is_familiar:
+{
+  "results": [
+    {
+      "likely_issue": "...",
+      "probable_root_cause": "...",
+      "confidence": 0.0,
+      "is_familiar": false
+    }
+  ]
+}"""
+
+_BATCH_REASONING_SYSTEM_MESSAGE = SystemMessage(content=BATCH_REASONING_SYSTEM_PROMPT)
+_BATCH_REASONING_USER_TMPL = string.Template("ALERTS:\n$alerts_json")
+
+
+@function(image=agent_image, secrets=["GROQ_API_KEY"])
+async def reason_batch_with_groq(
+    alert_infos: List[Dict[str, Any]],
+    internal_contexts: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    alerts = [
+        {"alert": _compact_alert(alert_info), "internal_context": internal_context}
+        for alert_info, internal_context in zip(alert_infos, internal_contexts)
+    ]
+    messages = [
+        _BATCH_REASONING_SYSTEM_MESSAGE,
+        HumanMessage(content=_BATCH_REASONING_USER_TMPL.substitute(alerts_json=_dump(alerts)))
+    ]
+
+    try:
+        blob = await _stream_json(_groq(REASONING_MODEL), messages)
+        results = orjson.loads(blob).get("results", []) if blob else []
+        if len(results) != len(alerts):
+            raise ValueError(f"Expected {len(alerts)} results, got {len(results)}")
+    except Exception as e:
+        results = [_reasoning_failure(e) for _ in alerts]
+
+    # Re-reason the alerts the small model was unsure about (or failed on)
+    # one at a time on the large model.
+    retry = [i for i, reasoning in enumerate(results) if _confidence(reasoning) < FALLBACK_CONFIDENCE]
+    retried = await asyncio.gather(*(
+        _reason(
+            FALLBACK_REASONING_MODEL,
+            _reasoning_messages(alert_infos[i], internal_contexts[i])
+        )
+        for i in retry
+    ))
+    for i, reasoning in zip(retry, retried):
+        results[i] = reasoning
+    return results
+
+
+REASONING_FAILED = "Reasoning failed"
+
+
+def _reasoning_failure(error: Exception) -> Dict[str, Any]:
+    return {
+        "likely_issue": REASONING_FAILED,
+        "probable_root_cause": str(error),
+        "confidence": 0.0,
+        "is_familiar": False
+    }
+
+
+# Longer alerts are almost always stack traces or log excerpts; the head
+# carries the signal.
+MAX_ALERT_CHARS = 500
+
+
+def _compact_alert(alert_info: Dict[str, Any]) -> Dict[str, Any]:
+    """Only the fields the model needs, under short keys, to keep prompts small."""
+    return {
+        "svc": alert_info["service"],
+        "sev": alert_info["severity"],
+        "kw": alert_info["keywords"],
+        "err": alert_info["error_codes"],
+        "txt": alert_info["raw_alert"][:MAX_ALERT_CHARS]
+    }
+
+
+def _dump(obj: Any) -> str:
+    """Compact JSON for prompt payloads; indentation only costs tokens."""
+    return orjson.dumps(obj).decode()
+
+
+def _extract_json(text: str) -> Optional[str]:
+    """Return the first balanced top-level JSON object in text, if any.
+
+    Single pass that tracks brace depth and ignores braces inside string
+    literals, so code fences, trailing prose or a second object don't leak in.
+    """
+    start = text.find("{")
+    if start == -1:
+        return None
+
+    depth = 0
+    in_string = False
+    escaped = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return None
+
+
+async def _stream_json(llm: ChatGroq, messages: List[Any]) -> Optional[str]:
+    """Stream a completion and stop as soon as the first JSON object closes.
+
+    Anything the model writes after the object is never read, so there is
+    no point waiting for those tokens.
+    """
+    buf: List[str] = []
+    stream = llm.astream(messages)
+    try:
+        async for chunk in stream:
+            buf.append(chunk.content)
+            if "}" in chunk.content:
+                blob = _extract_json("".join(buf))
+                if blob is not None:
+                    return blob
+    finally:
+        await stream.aclose()
+    return _extract_json("".join(buf))
 
 
 # ============================================================================
 # STEP 4: FETCH EXTERNAL KNOWLEDGE
 # ============================================================================
+# During an ongoing incident many alerts map to the same query; reuse the
+# results for a while instead of paying Exa latency and quota each time.
+# Keyed on (service, top-3 keywords) so alerts that differ only in their
+# error codes share an entry.
+_exa_cache = _TTLCache(maxsize=512, ttl=600)
+
+
 @function(image=agent_image, secrets=["EXA_API_KEY"])
-def fetch_external_knowledge(
-    alert_info: Dict[str, Any],
-    reasoning: Dict[str, Any]
-) -> Optional[str]:
+async def fetch_external_knowledge(alert_info: Dict[str, Any]) -> Optional[str]:
+    cache_key = (alert_info["service"], tuple(_external_keywords(alert_info)))
+    cached = _exa_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    query = _external_query(alert_info)
+
     try:
-        exa = Exa(api_key=os.environ["EXA_API_KEY"])
-        query = f"{alert_info['service']} outage {reasoning.get('probable_root_cause', '')}"
-        results = exa.search(query, num_results=3, type="neural")
-        return "\n".join(r.title for r in results.results)
+        exa = _exa()
+        # exa-py's client is synchronous; keep it off the event loop.
+        results = await asyncio.to_thread(exa.search, query, num_results=3, type="neural")
+        knowledge = "\n".join(r.title for r in results.results)
     except Exception:
         return None
 
+    _exa_cache.set(cache_key, knowledge)
+    return knowledge
+
+
+def _fetch_external_knowledge_in_background(alert_info: Dict[str, Any]) -> None:
+    """Start the Exa search if the alert warrants one, without waiting for it.
+
+    make_decision doesn't read the results, so the 1-2 s search stays off the
+    response path; it only warms _exa_cache for the rest of the incident.
+    """
+    if _needs_external_knowledge(alert_info):
+        fetch_external_knowledge.future(alert_info).run()
+
+
+def _needs_external_knowledge(alert_info: Dict[str, Any]) -> bool:
+    """Only search externally for serious or unrecognised incidents."""
+    return (
+        alert_info["severity"] in {"critical", "high"}
+        or alert_info["service"] == "unknown-service"
+    )
+
+
+def _external_keywords(alert_info: Dict[str, Any]) -> List[str]:
+    """Up to three matched keywords the query doesn't already contain."""
+    return [
+        kw for kw in alert_info.get("keywords", [])
+        if kw not in (alert_info["service"], "outage")
+    ][:3]
+
+
+def _external_query(alert_info: Dict[str, Any]) -> str:
+    """Build the Exa query from alert_info alone so it can run before reasoning."""
+    parts = [
+        alert_info["service"], "outage",
+        *_external_keywords(alert_info),
+        *alert_info.get("error_codes", [])
+    ]
+    return " ".join(parts)
+
 
 # ============================================================================
 # STEP 5: MAKE DECISION
 # ============================================================================
-@function(image=agent_image, secrets=["GROQ_API_KEY"])
 def make_decision(
     alert_info: Dict[str, Any],
     internal_context: Dict[str, Any],
     reasoning: Dict[str, Any],
-    external_knowledge: Optional[str]
+    incident_id: str
 ) -> Dict[str, Any]:
-    incident_id = f"inc-{datetime.now().strftime('%Y-%m-%d-%H%M')}"
+    """Turn the reasoning into a decision.
 
-    critical_keywords = [
-        "data loss", "corruption", "payment",
-        "billing", "checkout", "revenue", "breach"
-    ]
-
-    raw_alert = alert_info["raw_alert"].lower()
+    A plain helper like understand_alert: the rules are deterministic, and a
+    Tensorlake hop per alert would serialize outage_agent_batch.
+    """
+    confidence = _confidence(reasoning)
     should_escalate = (
         alert_info["severity"] == "critical"
-        or any(k in raw_alert for k in critical_keywords)
-        or reasoning.get("confidence", 0) < 0.6
+        or alert_info["force_escalate"]
+        or confidence < 0.6
     )
 
     summary = f"Issue detected in {alert_info['service']} with severity {alert_info['severity']}."
@@ -234,8 +889,8 @@ def make_decision(
         "service": alert_info["service"],
         "severity": alert_info["severity"],
         "status": "ongoing",
-        "root_cause": reasoning.get("probable_root_cause", "Unknown"),
-        "confidence": reasoning.get("confidence", 0.0),
+        "root_cause": str(reasoning.get("probable_root_cause") or "Unknown"),
+        "confidence": confidence,
         "actions_taken": [],
         "verification": {},
         "should_escalate": should_escalate,
@@ -252,18 +907,60 @@ def make_decision(
     }
 
 
+def direct_escalation(alert_info: Dict[str, Any], incident_id: str) -> Dict[str, Any]:
+    """Deterministic decision for alerts that hit a critical keyword."""
+    matched = [
+        kw for kw in alert_info["keywords"]
+        if any(category == "critical" for category, _ in _KEYWORD_INDEX[kw])
+    ]
+
+    summary = (
+        f"Critical issue detected in {alert_info['service']}; "
+        f"escalated immediately on business-impact keywords: {', '.join(matched)}."
+    )
+
+    decision = {
+        "incident_id": incident_id,
+        "service": alert_info["service"],
+        "severity": "critical",
+        "status": "ongoing",
+        "root_cause": "Not analyzed - escalated on business-impact keywords",
+        "confidence": 0.0,
+        "actions_taken": [],
+        "verification": {},
+        "should_escalate": True,
+        "next_recommendation": (
+            "IMMEDIATE HUMAN ESCALATION: business-critical impact "
+            f"({', '.join(matched)}) requires on-call investigation now"
+        )
+    }
+
+    return {
+        "summary": summary,
+        "decision": decision
+    }
+
+
 # ============================================================================
 # STEP 6: VERIFY AND STORE
 # ============================================================================
 @function(image=agent_image)
-def verify_and_store(decision_bundle: Dict[str, Any]) -> Dict[str, Any]:
+def verify_and_store(decision_bundle: Dict[str, Any], timestamp: str) -> Dict[str, Any]:
     return {
         "verified": True,
         "stored": True,
-        "timestamp": datetime.now().isoformat()
+        "timestamp": timestamp
     }
 
 
+def _store_in_background(decision_bundle: Dict[str, Any], timestamp: str) -> None:
+    """Start verify_and_store without holding up the response.
+
+    Its result is never read by the pipeline, so there is nothing to wait for.
+    """
+    verify_and_store.future(decision_bundle, timestamp).run()
+
+
 # ============================================================================
 # LOCAL TESTING
 # ============================================================================
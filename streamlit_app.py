@@ -151,7 +151,7 @@ with st.sidebar:
     st.markdown("""
     <div class="feature-card">
     <ul>
-    <li><strong>Groq Intelligence</strong>: Lightning-fast reasoning with Llama 3.3 70B</li>
+    <li><strong>Groq Intelligence</strong>: Lightning-fast reasoning with Llama 3.1 8B, backed by Llama 3.3 70B</li>
     <li><strong>Exa Integration</strong>: Real-time external incident correlation</li>
     <li><strong>Tensorlake Orchestration</strong>: Durable, observable workflows</li>
     <li><strong>Smart Escalation</strong>: Only wakes humans when truly needed</li>